@@ -4,12 +4,13 @@ import sys
 import time
 import os
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from PyQt5.QtWidgets import QApplication, QMessageBox
+from concurrent.futures import ThreadPoolExecutor, as_completed, CancelledError
+from PyQt5.QtWidgets import QApplication
 from openai import OpenAI
 from window import FileProcessorApp
 from pdf_processor import split_pdf_by_layout, split_pdfs  # 导入 split_pdfs 函数
 import file_reader
+from text_compactor import compact_text, estimate_tokens
 from utils import get_files, sanitize_filename, print_stats  # 导入 get_files, sanitize_filename 和 print_stats 函数
 
 # 设置PaddlePaddle的线程数
@@ -25,41 +26,61 @@ logging.basicConfig(filename='app.log', level=logging.INFO, format='%(asctime)s
 # 更改 API 密钥和基础 URL 为火山接口的信息
 client = OpenAI(api_key=API_KEY, base_url=BASE_URL)
 
-def extract_time_openai(text):
+# 提交给模型的文件内容的 token 预算（本地估算）
+PROMPT_TEXT_TOKEN_BUDGET = 2000
+
+def extract_time_openai(text, stats=None):
     """
     使用火山接口模型从文本中提取时间信息
+
+    :param text: 文件内容
+    :param stats: 可选的字典，用于返回压缩前后的 token 数和接口耗时
     """
+    compacted_text = compact_text(text, PROMPT_TEXT_TOKEN_BUDGET)
+    if stats is not None:
+        stats['original_tokens'] = estimate_tokens(text)
+        stats['compacted_tokens'] = estimate_tokens(compacted_text)
     try:
+        start_time = time.time()
         response = client.chat.completions.create(
             model=MODEL_NAME,
             messages=[{
                 "role": "user",
-                "content": f"假设你是文件重命名助手，分析文件生成时间与主要内容，以 “yyyymmdd_标题” 格式返回。若无法识别时间，以 “00000000_标题” 格式输出，标题简洁，不超 20 字。不需要任何解释。不需要解析过程。{text}"
+                "content": f"假设你是文件重命名助手，分析文件生成时间与主要内容，以 “yyyymmdd_标题” 格式返回。若无法识别时间，以 “00000000_标题” 格式输出，标题简洁，不超 20 字。不需要任何解释。不需要解析过程。{compacted_text}"
             }]
         )
+        if stats is not None:
+            stats['latency'] = time.time() - start_time
         logging.info("成功调用火山接口 API")
         return response.choices[0].message.content.strip()
     except Exception as e:
         error_message = f"调用火山接口 API 时出错：{e}"
         logging.error(error_message, exc_info=True)
-        QMessageBox.critical(None, "错误", error_message)
         return None
 
-def process_single_file(file, callback, processed_count, total_files):
+def process_single_file(file, tracker=None):
     """
     处理单个文件
     """
+    # 已请求取消时不再开始新的文件
+    if tracker is not None and tracker.cancelled:
+        raise CancelledError()
     try:
         start_time = time.time()
         content = file_reader.get_file_content(file)
         if content is None:
             logging.warning(f"读取文件 {file} 失败")
-            if callback:
-                callback(processed_count + 1, total_files)  # 调用回调函数
-            return (file, None, None)
+            return (file, None, None, None)
 
         content_length = len(content)
-        time_info = extract_time_openai(content)
+        api_stats = {}
+        if tracker is not None:
+            tracker.api_call_started()
+        try:
+            time_info = extract_time_openai(content, api_stats)
+        finally:
+            if tracker is not None:
+                tracker.api_call_finished()
         if time_info:
             file_dir = os.path.dirname(file)
             file_ext = os.path.splitext(file)[1]
@@ -68,20 +89,13 @@ def process_single_file(file, callback, processed_count, total_files):
             os.rename(file, new_file_path)
             elapsed_time = time.time() - start_time
             logging.info(f"文件 {file} 已重命名为 {new_file_path}")
-            if callback:
-                callback(processed_count + 1, total_files)  # 调用回调函数
-            return (new_file_path, elapsed_time, content_length)
+            return (new_file_path, elapsed_time, content_length, api_stats)
         else:
             logging.warning(f"文件 {file} 处理失败，未获取到时间信息")
-            if callback:
-                callback(processed_count + 1, total_files)  # 调用回调函数
-            return (file, None, content_length)
+            return (file, None, content_length, api_stats)
     except Exception as e:
         logging.error(f"处理文件 {file} 时出错：{e}", exc_info=True)
-        QMessageBox.critical(None, "错误", f"处理文件 {file} 时出错：{e}")
-        if callback:
-            callback(processed_count + 1, total_files)  # 调用回调函数
-        return (file, None, None)
+        return (file, None, None, None)
 
 class FileProcessor:
     def __init__(self, app):
@@ -93,7 +107,7 @@ class FileProcessor:
         """
         return len(get_files(directory))
 
-    def process_files_with_options(self, directory, process_option, callback=None):
+    def process_files_with_options(self, directory, process_option, tracker=None):
         """
         处理多个文件，根据选项决定是否进行PDF分割以及是否进行文件内容的识别和重命名
         """
@@ -101,50 +115,67 @@ class FileProcessor:
             files = get_files(directory)
         elif process_option == 2:  # 仅进行分割不识别
             pdf_files = get_files(directory, '.pdf')
-            split_pdfs(pdf_files, directory)  # 调用 pdf_processor.py 中的 split_pdfs 函数
-            QMessageBox.information(None, "完成", "仅进行了PDF分割。")
+            split_pdfs(pdf_files, directory, tracker)  # 调用 pdf_processor.py 中的 split_pdfs 函数
             return []
         elif process_option == 3:  # 进行分割和识别
             pdf_files = get_files(directory, '.pdf')
-            split_pdfs(pdf_files, directory)  # 调用 pdf_processor.py 中的 split_pdfs 函数
+            split_pdfs(pdf_files, directory, tracker)  # 调用 pdf_processor.py 中的 split_pdfs 函数
+            if tracker is not None and tracker.cancelled:
+                return []
             files = get_files(directory)
 
         if not files:
             return []
 
         total_files = len(files)  # 重新计算总文件数
-        processed_files = self.process_files(files, total_files, callback)
+        processed_files = self.process_files(files, total_files, tracker)
         return processed_files
 
-    def process_files(self, files, total_files, callback=None):
+    def process_files(self, files, total_files, tracker=None):
         """
         处理文件
         """
         file_times = {}
         file_sizes = {}
+        file_api_stats = {}
         total_elapsed_time = 0
         total_content_length = 0
         processed_files = []
+        if tracker is not None:
+            tracker.start_stage('recognize', total_files)
 
         # 使用单线程执行器
         with ThreadPoolExecutor(max_workers=1) as executor:
-            futures = {executor.submit(process_single_file, file, callback, i, total_files): file for i, file in enumerate(files)}
+            futures = {executor.submit(process_single_file, file, tracker): file for file in files}
             for future in as_completed(futures):
+                if tracker is not None and tracker.cancelled:
+                    # 取消尚未开始的任务，正在执行的任务会正常完成
+                    for pending in futures:
+                        pending.cancel()
                 try:
                     processed_file = future.result()
                     processed_files.append(processed_file)
-                    file, elapsed_time, content_length = processed_file
+                    file, elapsed_time, content_length, api_stats = processed_file
                     if elapsed_time is not None:
                         file_times[file] = elapsed_time
                         total_elapsed_time += elapsed_time
                     if content_length is not None:
                         file_sizes[file] = content_length
                         total_content_length += content_length
+                    if api_stats:
+                        file_api_stats[file] = api_stats
+                    if tracker is not None:
+                        tracker.file_done('recognize', error=elapsed_time is None)
+                except CancelledError:
+                    continue
                 except Exception as e:
                     logging.error(f"处理文件时出错：{e}", exc_info=True)
-                    QMessageBox.critical(None, "错误", f"处理文件时出错：{e}")
+                    if tracker is not None:
+                        tracker.file_done('recognize', error=True)
 
-        print_stats(file_times, file_sizes, total_elapsed_time, total_content_length)
+        if tracker is not None:
+            tracker.finish_stage('recognize')
+        print_stats(file_times, file_sizes, total_elapsed_time, total_content_length, file_api_stats)
         return processed_files
 
 if __name__ == '__main__':
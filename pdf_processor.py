@@ -7,24 +7,15 @@ import cv2
 from skimage.metrics import structural_similarity as ssim
 from PIL import Image
 import numpy as np
+from collections import Counter
 
-def analyze_layout(page):
-    """
-    分析页面布局，提取文本块的位置信息。
-
-    :param page: PyMuPDF 页面对象
-    :return: 包含文本块位置信息的列表
-    """
-    layout_features = []
-    text_dict = page.get_text("dict")
-    if "blocks" in text_dict:
-        for block in text_dict["blocks"]:
-            if "lines" in block:
-                for line in block["lines"]:
-                    for span in line["spans"]:
-                        bbox = span["bbox"]
-                        layout_features.append((span["size"], span["font"], bbox))
-    return layout_features
+# 分割判定阈值
+SPAN_DELTA_THRESHOLD = 10          # 文本块数量变化超过该值视为新文件
+TEXT_SIMILARITY_THRESHOLD = 0.8    # 文本相似度低于该值视为新文件
+IMAGE_SIMILARITY_THRESHOLD = 0.9   # 图像相似度低于该值视为新文件
+# 文本和字体布局都高于以下阈值时直接判定为同一文件，不再比较图像
+TEXT_SAME_THRESHOLD = 0.95
+FONT_SAME_THRESHOLD = 0.9
 
 def calculate_image_similarity(img1, img2):
     """
@@ -60,21 +51,88 @@ def calculate_image_similarity(img1, img2):
     similarity = (similarity_ssim + similarity_feature) / 2
     return similarity
 
-def extract_text_similarity(prev_text, current_text):
+def token_set_similarity(prev_tokens, current_tokens):
     """
-    计算两段文本的相似度。
+    计算两个词集合的 Jaccard 相似度。
 
-    :param prev_text: 上一页的文本
-    :param current_text: 当前页的文本
-    :return: 文本相似度
+    :param prev_tokens: 上一页的词集合
+    :param current_tokens: 当前页的词集合
+    :return: 文本相似度，任一集合为空时返回 0
     """
-    if not prev_text.strip() or not current_text.strip():
+    if not prev_tokens or not current_tokens:
         return 0
-    prev_words = set(prev_text.split())
-    current_words = set(current_text.split())
-    intersection = prev_words & current_words
-    union = prev_words | current_words
-    return len(intersection) / len(union)
+    return len(prev_tokens & current_tokens) / len(prev_tokens | current_tokens)
+
+def font_fingerprint_similarity(prev_fonts, current_fonts):
+    """
+    计算两页字体/字号分布的相似度（加权 Jaccard）。
+
+    :param prev_fonts: 上一页的字体/字号计数
+    :param current_fonts: 当前页的字体/字号计数
+    :return: 布局相似度
+    """
+    union = sum((prev_fonts | current_fonts).values())
+    if union == 0:
+        return 1.0
+    return sum((prev_fonts & current_fonts).values()) / union
+
+def extract_page_features(page):
+    """
+    一次遍历页面文本结构，同时提取词集合和字体/字号布局指纹。
+
+    :param page: PyMuPDF 页面对象
+    :return: 包含词集合、文本块数量和字体/字号计数的字典
+    """
+    lines = []
+    fonts = Counter()
+    span_count = 0
+    for block in page.get_text("dict").get("blocks", []):
+        for line in block.get("lines", []):
+            line_text = []
+            for span in line["spans"]:
+                span_count += 1
+                fonts[(span["font"], round(span["size"], 1))] += 1
+                line_text.append(span["text"])
+            lines.append("".join(line_text))
+    return {
+        "tokens": frozenset(" ".join(lines).split()),
+        "span_count": span_count,
+        "fonts": fonts,
+    }
+
+def detect_boundary_by_features(prev_features, current_features):
+    """
+    使用文本和布局特征判断当前页是否为新文件的开始。
+
+    :param prev_features: 上一页的特征
+    :param current_features: 当前页的特征
+    :return: True 表示分割，False 表示不分割，None 表示无法确定、需要比较图像
+    """
+    # 两页都没有可提取的文本（如扫描件），文本特征无法判断
+    if not prev_features["tokens"] and not current_features["tokens"]:
+        return None
+
+    if abs(current_features["span_count"] - prev_features["span_count"]) > SPAN_DELTA_THRESHOLD:
+        return True
+    text_similarity = token_set_similarity(prev_features["tokens"], current_features["tokens"])
+    if text_similarity < TEXT_SIMILARITY_THRESHOLD:
+        return True
+
+    font_similarity = font_fingerprint_similarity(prev_features["fonts"], current_features["fonts"])
+    if text_similarity >= TEXT_SAME_THRESHOLD and font_similarity >= FONT_SAME_THRESHOLD:
+        return False
+    return None
+
+def render_page(page):
+    """
+    将页面渲染为图像。
+
+    :param page: PyMuPDF 页面对象
+    :return: 图像的 NumPy 数组
+    """
+    pix = page.get_pixmap()
+    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    return np.array(img)
 
 def save_split_pdf(doc, current_file_pages, output_dir, file_index):
     """
@@ -96,48 +154,56 @@ def split_pdf_by_layout(pdf_path, output_dir):
     """
     根据布局和图像相似度分割 PDF 文件。
 
+    先用文本和布局特征判断分割位置，只有无法确定的页面才进行图像比较。
+
     :param pdf_path: PDF 文件路径
     :param output_dir: 输出目录
+    :return: 处理的页数，出错时返回 None
     """
     try:
         with fitz.open(pdf_path) as doc:
-            if doc.page_count == 1:
+            page_count = doc.page_count
+            if page_count <= 1:
                 logging.info(f"PDF 文件 {pdf_path} 仅有一页，跳过分割")
-                return
+                return page_count
 
             layout_changes = []
-            prev_layout = None
+            tier_hits = {"split": 0, "keep": 0, "image_split": 0, "image_keep": 0}
+            prev_features = None
             prev_image = None
-            prev_text = ""
 
             for page_num in range(doc.page_count):
                 page = doc[page_num]
-                current_layout = analyze_layout(page)
-                pix = page.get_pixmap()
-                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                img_array = np.array(img)
-                current_text = page.get_text()
-
-                if prev_layout is None:
-                    prev_layout = current_layout
-                    prev_image = img_array
-                    prev_text = current_text
-                    continue
-
-                # 判断文本内容变化
-                text_similarity = extract_text_similarity(prev_text, current_text)
-                if abs(len(current_layout) - len(prev_layout)) > 10 or text_similarity < 0.8:
-                    layout_changes.append(page_num)
-
-                # 判断图像相似度
-                if prev_image is not None:
-                    similarity = calculate_image_similarity(prev_image, img_array)
-                    if similarity < 0.9:
+                current_features = extract_page_features(page)
+                current_image = None
+
+                if prev_features is not None:
+                    # 判断文本和布局变化
+                    is_boundary = detect_boundary_by_features(prev_features, current_features)
+                    if is_boundary is None:
+                        # 文本和布局无法确定时才渲染页面并比较图像相似度
+                        if prev_image is None:
+                            prev_image = render_page(doc[page_num - 1])
+                        current_image = render_page(page)
+                        similarity = calculate_image_similarity(prev_image, current_image)
+                        is_boundary = similarity < IMAGE_SIMILARITY_THRESHOLD
+                        tier_hits["image_split" if is_boundary else "image_keep"] += 1
+                    else:
+                        tier_hits["split" if is_boundary else "keep"] += 1
+                    if is_boundary:
                         layout_changes.append(page_num)
 
-                prev_layout = current_layout
-                prev_image = img_array
-                prev_text = current_text
+                prev_features = current_features
+                prev_image = current_image
+
+            compared = page_count - 1
+            logging.info(
+                f"PDF 文件 {pdf_path} 分割检测：比较 {compared} 页，"
+                f"文本/布局判定分割 {tier_hits['split']} 页（{tier_hits['split'] / compared:.0%}），"
+                f"判定不分割 {tier_hits['keep']} 页（{tier_hits['keep'] / compared:.0%}），"
+                f"图像比较判定分割 {tier_hits['image_split']} 页（{tier_hits['image_split'] / compared:.0%}），"
+                f"判定不分割 {tier_hits['image_keep']} 页（{tier_hits['image_keep'] / compared:.0%}）"
+            )
 
             # 使用原始文件所在的目录作为输出目录
             output_dir = os.path.dirname(pdf_path)
@@ -157,17 +223,31 @@ def split_pdf_by_layout(pdf_path, output_dir):
         except Exception as e:
             logging.error(f"删除原始 PDF 文件 {pdf_path} 时出错：{e}")
 
+        return page_count
+
     except Exception as e:
         logging.error(f"分割 PDF 文件 {pdf_path} 时出错：{e}")
+        return None
 
-def split_pdfs(pdf_files, directory):
+def split_pdfs(pdf_files, directory, tracker=None):
     """
     分割多个 PDF 文件。
 
     :param pdf_files: PDF 文件列表
     :param directory: 输出目录
+    :param tracker: 进度模型（可选），用于记录进度并响应取消请求
     """
+    if tracker is not None:
+        tracker.start_stage('split', len(pdf_files))
     for pdf_file in pdf_files:
+        # 单个文件的分割不可中断，取消请求在文件之间生效
+        if tracker is not None and tracker.cancelled:
+            logging.info("PDF 分割已取消")
+            break
         logging.info(f"开始分割 PDF 文件: {pdf_file}")
-        split_pdf_by_layout(pdf_file, directory)
-        logging.info(f"完成分割 PDF 文件: {pdf_file}")
\ No newline at end of file
+        page_count = split_pdf_by_layout(pdf_file, directory)
+        logging.info(f"完成分割 PDF 文件: {pdf_file}")
+        if tracker is not None:
+            tracker.file_done('split', pages=page_count or 0, error=page_count is None)
+    if tracker is not None:
+        tracker.finish_stage('split')
\ No newline at end of file
@@ -0,0 +1,148 @@
+# progress.py
+
+import threading
+import time
+from collections import deque
+
+# 各处理阶段在界面上显示的名称
+STAGE_NAMES = {
+    'split': 'PDF 分割',
+    'recognize': '识别重命名',
+}
+
+class ProgressTracker:
+    """
+    线程安全的进度模型。
+
+    由工作线程在处理过程中写入各阶段的完成数、页数、错误数和进行中的 API 调用数，
+    界面线程定时读取快照进行显示，两者之间不直接传递逐条事件。
+    """
+
+    def __init__(self, window_size=20):
+        """
+        初始化进度模型。
+
+        :param window_size: 计算滚动速度（用于预计剩余时间）时保留的最近完成事件数
+        """
+        self._lock = threading.Lock()
+        self._cancel_event = threading.Event()
+        self._window_size = window_size
+        self._stages = {}
+        self._current_stage = None
+        self._api_in_flight = 0
+
+    def start_stage(self, stage, total):
+        """
+        开始一个新的处理阶段。
+
+        :param stage: 阶段名称（见 STAGE_NAMES）
+        :param total: 该阶段需要处理的文件总数
+        """
+        with self._lock:
+            self._stages[stage] = {
+                'total': total,
+                'done': 0,
+                'pages': 0,
+                'errors': 0,
+                'start_time': time.monotonic(),
+                'end_time': None,
+                'recent': deque(maxlen=self._window_size),
+            }
+            self._current_stage = stage
+
+    def finish_stage(self, stage):
+        """
+        标记处理阶段结束，之后该阶段的速度不再随时间变化。
+
+        :param stage: 阶段名称
+        """
+        with self._lock:
+            if stage in self._stages:
+                self._stages[stage]['end_time'] = time.monotonic()
+
+    def file_done(self, stage, pages=0, error=False):
+        """
+        记录一个文件处理完成。
+
+        :param stage: 阶段名称
+        :param pages: 该文件处理的页数
+        :param error: 该文件是否处理失败
+        """
+        with self._lock:
+            info = self._stages[stage]
+            info['done'] += 1
+            info['pages'] += pages
+            if error:
+                info['errors'] += 1
+            info['recent'].append(time.monotonic())
+
+    def api_call_started(self):
+        """记录一次 API 调用开始"""
+        with self._lock:
+            self._api_in_flight += 1
+
+    def api_call_finished(self):
+        """记录一次 API 调用结束"""
+        with self._lock:
+            self._api_in_flight -= 1
+
+    def cancel(self):
+        """请求取消处理，已在进行中的文件会正常完成"""
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        """是否已请求取消"""
+        return self._cancel_event.is_set()
+
+    def snapshot(self):
+        """
+        获取当前进度的快照。
+
+        :return: 包含当前阶段、各阶段统计、进行中的 API 调用数和取消状态的字典
+        """
+        now = time.monotonic()
+        with self._lock:
+            stages = {}
+            for name, info in self._stages.items():
+                end_time = info['end_time'] if info['end_time'] is not None else now
+                elapsed = max(end_time - info['start_time'], 1e-6)
+                stages[name] = {
+                    'total': info['total'],
+                    'done': info['done'],
+                    'pages': info['pages'],
+                    'errors': info['errors'],
+                    'files_per_sec': info['done'] / elapsed,
+                    'pages_per_sec': info['pages'] / elapsed,
+                    'eta': self._estimate_eta(info, now),
+                }
+            return {
+                'stage': self._current_stage,
+                'stages': stages,
+                'api_in_flight': self._api_in_flight,
+                'cancelled': self.cancelled,
+            }
+
+    def _estimate_eta(self, info, now):
+        """
+        根据最近完成事件的滚动速度估算阶段剩余时间，并扣除距上次完成已经过的时间。
+
+        :param info: 阶段统计信息
+        :param now: 当前时间
+        :return: 剩余秒数，无法估算或阶段未完成即结束（已取消）时返回 None
+        """
+        remaining = info['total'] - info['done']
+        if remaining <= 0:
+            return 0.0
+        if info['end_time'] is not None:
+            return None
+        recent = info['recent']
+        rate = None
+        if len(recent) >= 2 and recent[-1] > recent[0]:
+            rate = (len(recent) - 1) / (recent[-1] - recent[0])
+        elif info['done'] > 0 and now > info['start_time']:
+            rate = info['done'] / (now - info['start_time'])
+        if not rate:
+            return None
+        since_last = now - recent[-1] if recent else 0.0
+        return max(remaining / rate - since_last, 0.0)
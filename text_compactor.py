@@ -0,0 +1,151 @@
+# text_compactor.py
+
+import math
+import re
+
+# 日期行匹配：2024年1月5日、2024-01-05、2024/1/5、2024.1、1月5日、20240105、二〇二四年
+DATE_PATTERN = re.compile(
+    r'(?:19|20)\d{2}\s*[年\-/.]\s*\d{1,2}'
+    r'|\d{1,2}\s*月\s*\d{1,2}\s*[日号]'
+    r'|(?<!\d)(?:19|20)\d{2}(?:0[1-9]|1[0-2])(?:0[1-9]|[12]\d|3[01])(?!\d)'
+    r'|[〇零一二三四五六七八九]{4}\s*年'
+)
+
+# 标题行匹配：第一章、第3条、一、（二）、1.2 等编号开头的行
+HEADING_PATTERN = re.compile(
+    r'^(?:第[一二三四五六七八九十百千\d]+[章节条部分篇]'
+    r'|[一二三四五六七八九十]+[、.．]'
+    r'|[（(][一二三四五六七八九十\d]+[）)]'
+    r'|\d+(?:\.\d+)*[、.．\s])'
+)
+
+# 文档开头若干行中的短行通常是标题或发文信息
+TITLE_AREA_LINES = 10
+HEADING_MAX_LENGTH = 30
+
+def _char_tokens(ch):
+    """
+    估算单个字符占用的 token 数。
+
+    中日韩文字和全角符号大致每字一个 token，其余字符大致每四个一个 token。
+    """
+    if '⺀' <= ch <= '鿿' or '豈' <= ch <= '￯':
+        return 1.0
+    if ch.isspace():
+        return 0.0
+    return 0.25
+
+def estimate_tokens(text):
+    """
+    在本地粗略估算文本的 token 数，无需调用接口或加载分词器。
+
+    :param text: 文本
+    :return: 估算的 token 数
+    """
+    return math.ceil(sum(_char_tokens(ch) for ch in text))
+
+def normalize_lines(text):
+    """
+    规范化空白字符并拆分为行，表格中相邻重复的单元格（合并单元格）只保留一个。
+
+    :param text: 原始文本
+    :return: 非空行列表
+    """
+    lines = []
+    for raw_line in text.splitlines():
+        cells = []
+        for cell in raw_line.split('\t'):
+            cell = re.sub(r'\s+', ' ', cell).strip()
+            if cell and (not cells or cells[-1] != cell):
+                cells.append(cell)
+        line = ' '.join(cells)
+        if line:
+            lines.append(line)
+    return lines
+
+def deduplicate_lines(lines):
+    """
+    去除重复的行（如每页重复的页眉、表头），保留首次出现的位置。
+
+    :param lines: 行列表
+    :return: 去重后的行列表
+    """
+    seen = set()
+    unique_lines = []
+    for line in lines:
+        if line not in seen:
+            seen.add(line)
+            unique_lines.append(line)
+    return unique_lines
+
+def is_heading(line, index):
+    """
+    判断一行是否像标题。
+
+    :param line: 行文本
+    :param index: 行在文档中的位置
+    :return: 是否为标题行
+    """
+    if len(line) > HEADING_MAX_LENGTH:
+        return False
+    return index < TITLE_AREA_LINES or bool(HEADING_PATTERN.match(line))
+
+def prioritize_lines(lines):
+    """
+    确定裁剪时保留行的优先顺序：含日期的行和标题行优先，其余行按原有顺序。
+
+    :param lines: 行列表
+    :return: 按优先顺序排列的行号列表
+    """
+    priority_indexes = []
+    other_indexes = []
+    for index, line in enumerate(lines):
+        if DATE_PATTERN.search(line) or is_heading(line, index):
+            priority_indexes.append(index)
+        else:
+            other_indexes.append(index)
+    return priority_indexes + other_indexes
+
+def trim_to_budget(lines, token_budget):
+    """
+    按优先顺序保留行，直到达到 token 预算，超出预算的行按字符截断。
+    保留下来的行按原文顺序输出，避免日期脱离上下文。
+
+    :param lines: 行列表
+    :param token_budget: token 预算
+    :return: 截断后的文本
+    """
+    kept_lines = {}
+    used_tokens = 0.0
+    for index in prioritize_lines(lines):
+        line = lines[index]
+        line_tokens = sum(_char_tokens(ch) for ch in line)
+        if used_tokens + line_tokens <= token_budget:
+            kept_lines[index] = line
+            used_tokens += line_tokens
+            continue
+        # 在剩余预算内截断当前行，然后停止
+        truncated = []
+        for ch in line:
+            used_tokens += _char_tokens(ch)
+            if used_tokens > token_budget:
+                break
+            truncated.append(ch)
+        if truncated:
+            kept_lines[index] = ''.join(truncated)
+        break
+    return '\n'.join(kept_lines[index] for index in sorted(kept_lines))
+
+def compact_text(text, token_budget):
+    """
+    压缩提交给模型的文本：规范化空白、去除重复行，超出 token 预算时优先保留日期行和标题行进行裁剪。
+
+    :param text: 原始文本
+    :param token_budget: token 预算
+    :return: 压缩后的文本
+    """
+    lines = deduplicate_lines(normalize_lines(text))
+    compacted_text = '\n'.join(lines)
+    if estimate_tokens(compacted_text) <= token_budget:
+        return compacted_text
+    return trim_to_budget(lines, token_budget)
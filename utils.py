@@ -26,7 +26,7 @@ def sanitize_filename(filename):
     """
     return "".join(x for x in filename if x.isalnum() or x in "._- ")
 
-def print_stats(file_times, file_sizes, total_elapsed_time, total_content_length):
+def print_stats(file_times, file_sizes, total_elapsed_time, total_content_length, file_api_stats=None):
     """
     打印统计信息
     """
@@ -39,4 +39,21 @@ def print_stats(file_times, file_sizes, total_elapsed_time, total_content_length
         print(f"{file}: {content_length} 字节")
 
     print(f"\n总的文件处理时间: {total_elapsed_time:.2f} 秒")
-    print(f"总的文件内容长度: {total_content_length} 字节")
\ No newline at end of file
+    print(f"总的文件内容长度: {total_content_length} 字节")
+
+    if file_api_stats:
+        print("\n每个文件的接口调用统计：")
+        total_saved_tokens = 0
+        latencies = []
+        for file, stats in file_api_stats.items():
+            saved_tokens = stats['original_tokens'] - stats['compacted_tokens']
+            total_saved_tokens += saved_tokens
+            line = f"{file}: {stats['original_tokens']} -> {stats['compacted_tokens']} tokens，节省 {saved_tokens} tokens"
+            if 'latency' in stats:
+                latencies.append(stats['latency'])
+                line += f"，接口耗时 {stats['latency']:.2f} 秒"
+            print(line)
+
+        print(f"\n总共节省 tokens: {total_saved_tokens}")
+        if latencies:
+            print(f"平均接口耗时: {sum(latencies) / len(latencies):.2f} 秒")
\ No newline at end of file
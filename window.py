@@ -3,13 +3,13 @@
 from PyQt5.QtWidgets import (QApplication, QWidget, QPushButton, QVBoxLayout, 
                             QRadioButton, QButtonGroup, QLabel, QProgressBar, 
                             QMessageBox, QFileDialog, QDialog)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
-from utils import get_files  # 导入 get_files 函数
-from pdf_processor import split_pdfs  # 导入 split_pdfs 函数
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
+from progress import ProgressTracker, STAGE_NAMES
+
+# 界面刷新进度的间隔（毫秒），避免高频事件占满 Qt 事件循环
+PROGRESS_REFRESH_INTERVAL = 250
 
 class Worker(QThread):
-    # 定义一个信号，传递已处理文件数和总文件数
-    progress = pyqtSignal(int, int)  
     # 定义一个信号，表示处理完成
     finished = pyqtSignal()  
 
@@ -25,24 +25,34 @@ class Worker(QThread):
         self.processor = processor
         self.directory = directory
         self.process_option = process_option
+        self.tracker = ProgressTracker()
 
     def run(self):
         """
         线程运行时调用的方法。
-        获取文件总数并启动文件处理过程，完成后发出完成信号。
+        依次执行PDF分割和文件识别，过程中写入进度模型，完成后发出完成信号。
         """
-        total_files = self.processor.get_total_files(self.directory)
-        self.processor.process_files_with_options(self.directory, self.process_option, self.progress_callback)
+        self.processor.process_files_with_options(self.directory, self.process_option, tracker=self.tracker)
         self.finished.emit()  # 发出完成信号
 
-    def progress_callback(self, processed, total):
+    def cancel(self):
+        """请求取消处理，正在处理的文件完成后停止"""
+        self.tracker.cancel()
+
+class ProgressDialog(QDialog):
+    def __init__(self, parent, on_cancel):
         """
-        进度回调函数，将进度信息转发给进度信号。
+        初始化进度对话框。
 
-        :param processed: 已处理文件数
-        :param total: 总文件数
+        :param parent: 父窗口
+        :param on_cancel: 用户关闭对话框或按 Esc 时调用的取消函数
         """
-        self.progress.emit(processed, total)  # 将回调转发给进度信号
+        super().__init__(parent)
+        self.on_cancel = on_cancel
+
+    def reject(self):
+        """关闭对话框或按 Esc 时只请求取消，对话框保持显示直到处理结束"""
+        self.on_cancel()
 
 class FileProcessorApp(QWidget):
     def __init__(self, processor):
@@ -124,58 +134,117 @@ class FileProcessorApp(QWidget):
         :param directory: 需要处理的文件夹路径
         :param process_option: 处理选项（1: 仅识别不分割, 2: 仅分割不识别, 3: 分割和识别）
         """
-        # 先进行PDF分割
-        if process_option == 2 or process_option == 3:
-            pdf_files = get_files(directory, '.pdf')
-            split_pdfs(pdf_files, directory)  # 直接调用 pdf_processor.py 中的 split_pdfs 函数
-
-        # 重新计算总文件数
-        total_files = self.processor.get_total_files(directory)
-        self.progress_dialog, self.progress_bar = self.show_progress_dialog(total_files)
+        # PDF分割和识别都在工作线程中执行，界面线程只负责显示进度
+        self.process_button.setEnabled(False)
+        self.progress_dialog, self.progress_bar = self.show_progress_dialog()
 
         self.worker = Worker(self.processor, directory, process_option)
-        self.worker.progress.connect(self.update_progress)
         self.worker.finished.connect(self.on_processing_finished)  # 添加完成信号连接
+
+        # 定时读取进度快照，而不是逐条转发工作线程的事件
+        self.progress_timer = QTimer(self)
+        self.progress_timer.setInterval(PROGRESS_REFRESH_INTERVAL)
+        self.progress_timer.timeout.connect(self.update_progress)
+        self.progress_timer.start()
+
         self.worker.start()
 
-    def show_progress_dialog(self, total_files):
+    def show_progress_dialog(self):
         """
         显示进度对话框。
 
-        :param total_files: 总文件数
         :return: 进度对话框和进度条对象
         """
-        dialog = QDialog(self)
+        # 关闭对话框或按 Esc 同样视为取消
+        dialog = ProgressDialog(self, self.cancel_processing)
         dialog.setWindowTitle("进度")
-        dialog.setGeometry(100, 100, 300, 150)
+        dialog.setGeometry(100, 100, 360, 220)
 
-        self.progress_label = QLabel("0% 完成", dialog)
-        self.progress_label.setAlignment(Qt.AlignCenter)
+        self.stage_label = QLabel("准备中…", dialog)
+        self.stage_label.setAlignment(Qt.AlignCenter)
 
         self.progress_bar = QProgressBar(dialog)
-        self.progress_bar.setRange(0, total_files)
+        self.progress_bar.setRange(0, 0)
         self.progress_bar.setAlignment(Qt.AlignCenter)
 
+        self.progress_label = QLabel("", dialog)
+        self.progress_label.setAlignment(Qt.AlignLeft)
+
+        self.cancel_button = QPushButton("取消", dialog)
+        self.cancel_button.clicked.connect(self.cancel_processing)
+
         layout = QVBoxLayout()
-        layout.addWidget(self.progress_label)
+        layout.addWidget(self.stage_label)
         layout.addWidget(self.progress_bar)
+        layout.addWidget(self.progress_label)
+        layout.addWidget(self.cancel_button)
 
         dialog.setLayout(layout)
         dialog.show()
         return dialog, self.progress_bar
 
-    def update_progress(self, processed_count, total_files):
-        """
-        更新进度条和标签。
-
-        :param processed_count: 已处理文件数
-        :param total_files: 总文件数
-        """
-        percent = int((processed_count / total_files) * 100)
-        self.progress_label.setText(f"{percent}% 完成")
-        self.progress_bar.setValue(processed_count)
+    def update_progress(self):
+        """根据工作线程的进度快照更新进度条和统计信息"""
+        snapshot = self.worker.tracker.snapshot()
+        stage = snapshot['stage']
+        if stage is None:
+            return
+        info = snapshot['stages'][stage]
+        total = info['total']
+        done = info['done']
+
+        self.progress_bar.setRange(0, max(total, 1))
+        self.progress_bar.setValue(done)
+        percent = int((done / total) * 100) if total else 100
+        status = "（正在取消）" if snapshot['cancelled'] else ""
+        self.stage_label.setText(f"{STAGE_NAMES.get(stage, stage)}：{done}/{total}，{percent}% 完成{status}")
+
+        lines = [f"速度：{info['files_per_sec']:.2f} 文件/秒"]
+        if stage == 'split':
+            lines[0] += f"，{info['pages_per_sec']:.1f} 页/秒"
+        else:
+            lines.append(f"进行中的 API 调用：{snapshot['api_in_flight']}")
+        errors = "，".join(f"{STAGE_NAMES.get(name, name)} {item['errors']}"
+                          for name, item in snapshot['stages'].items())
+        lines.append(f"错误：{errors}")
+        eta = "已取消" if snapshot['cancelled'] else self.format_eta(info['eta'])
+        lines.append(f"预计剩余：{eta}")
+        self.progress_label.setText("\n".join(lines))
+
+    @staticmethod
+    def format_eta(eta):
+        """
+        格式化预计剩余时间。
+
+        :param eta: 剩余秒数，可能为 None
+        :return: 显示用的字符串
+        """
+        if eta is None:
+            return "—"
+        minutes, seconds = divmod(int(eta), 60)
+        hours, minutes = divmod(minutes, 60)
+        if hours:
+            return f"{hours}:{minutes:02d}:{seconds:02d}"
+        return f"{minutes:02d}:{seconds:02d}"
+
+    def cancel_processing(self):
+        """请求取消处理，等待正在处理的文件完成"""
+        if self.worker.isRunning() and not self.worker.tracker.cancelled:
+            self.worker.cancel()
+            self.cancel_button.setEnabled(False)
+            self.cancel_button.setText("正在取消…")
+            self.update_progress()
 
     def on_processing_finished(self):
         """处理完成后关闭进度对话框并显示完成消息"""
+        self.progress_timer.stop()
+        self.update_progress()
         self.progress_dialog.accept()
-        QMessageBox.information(None, "完成", "文件处理已完成。")
\ No newline at end of file
+        self.process_button.setEnabled(True)
+        snapshot = self.worker.tracker.snapshot()
+        total_errors = sum(info['errors'] for info in snapshot['stages'].values())
+        error_text = f"处理失败 {total_errors} 个文件，详见 app.log。" if total_errors else ""
+        if snapshot['cancelled']:
+            QMessageBox.information(self, "已取消", f"文件处理已取消，未处理的文件保持原样。{error_text}")
+        else:
+            QMessageBox.information(self, "完成", f"文件处理已完成。{error_text}")
\ No newline at end of file